@@ -1,16 +1,33 @@
+import os
+
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
-from passlib.context import CryptContext
+import bcrypt
+
+# bcrypt does 2^rounds key expansions, so every step down halves the CPU
+# spent per hash/verify. Verifying always uses the cost stored in the hash,
+# hashes below this cost are upgraded on the next successful login but never
+# downgraded. The default suits development, production sets it in the image.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt only looks at the first 72 bytes of a password, passlib truncated
+# silently so we do the same to keep existing hashes verifiable
+BCRYPT_MAX_PASSWORD_BYTES = 72
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 class Hash:
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str):
-        return pwd_context.verify(plain_password, hashed_password)
+        password = plain_password.encode()[:BCRYPT_MAX_PASSWORD_BYTES]
+        return bcrypt.checkpw(password, hashed_password.encode())
 
     @staticmethod
     def get_password_hash(password: str):
-        return pwd_context.hash(password)
\ No newline at end of file
+        password = password.encode()[:BCRYPT_MAX_PASSWORD_BYTES]
+        return bcrypt.hashpw(password, bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+    @staticmethod
+    def needs_rehash(hashed_password: str):
+        # hashes look like $2b$<rounds>$<salt+digest>, only ever upgrade
+        return int(hashed_password.split("$")[2]) < BCRYPT_ROUNDS
\ No newline at end of file
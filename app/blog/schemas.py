@@ -1,6 +1,8 @@
+from typing import Annotated
+
 from sqlmodel import Field, SQLModel
-from pydantic import EmailStr
-from pydantic import BaseModel
+from pydantic import EmailStr, StringConstraints
+from pydantic import BaseModel, ConfigDict
 
 # to get a string like this run:
 # openssl rand -hex 32
@@ -8,6 +10,11 @@ SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# cheap shape check for emails that were already validated with EmailStr on
+# signup, pydantic-core builds the regex once when the schema is created
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+EmailFast = Annotated[str, StringConstraints(pattern=EMAIL_PATTERN)]
+
 class BlogBase(SQLModel):
     title: str = Field()
     body: str
@@ -16,8 +23,11 @@ class Blog(BlogBase, table=True):
     id: int | None = Field(default=None, primary_key=True, index=True)
 
 class ShowBlg(BlogBase):
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class BlogPage(SQLModel):
+    items: list[ShowBlg]
+    next_cursor: int | None = None
 
 
 class UserBase(SQLModel):
@@ -27,15 +37,15 @@ class UserBase(SQLModel):
 
 class ShowUserBase(SQLModel):
     name: str
-    email: EmailStr
+    email: EmailFast
 
 
 class User(UserBase, table=True):
     id: int | None = Field(default=None, primary_key=True, index=True)
+    email: EmailFast = Field(index=True, unique=True)
 
 class ShowUser(ShowUserBase):
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Token(BaseModel):
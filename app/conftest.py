@@ -0,0 +1,16 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# point the app at a throwaway database before db.py builds the engine
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db"
+
+from blog import schemas  # noqa: E402, F401, registers the tables on the metadata
+from db import create_db_and_tables  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    asyncio.run(create_db_and_tables())
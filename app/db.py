@@ -1,20 +1,97 @@
+import asyncio
+import os
+import sys
 from typing import Annotated
 from fastapi import Depends
-from sqlmodel import create_engine, SQLModel, Session
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 # Code above omitted 👆
 
 sqlite_file_name = "blog.db"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
+sqlite_url = f"sqlite+aiosqlite:///{sqlite_file_name}"
 
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, connect_args=connect_args)
+database_url = os.getenv("DATABASE_URL", sqlite_url)
+if database_url.startswith("postgresql://"):
+    database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+if database_url.startswith("sqlite"):
+    connect_args = {"check_same_thread": False}
+    engine = create_async_engine(database_url, connect_args=connect_args)
 
-def get_session():
-    with Session(engine) as session:
+    # WAL lets readers run alongside a writer, the other pragmas are per
+    # connection so they are applied to every new pooled connection
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=memory")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.close()
+else:
+    engine = create_async_engine(
+        database_url,
+        pool_size=20,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_pre_ping=True,
+        echo=False,
+        # the app only has a handful of distinct queries, keep every prepared
+        # statement for the lifetime of the connection
+        connect_args={"statement_cache_size": 1024, "prepared_statement_cache_size": 512},
+    )
+
+# dialect specific insert so callers can use on_conflict_do_nothing
+if engine.dialect.name == "postgresql":
+    from sqlalchemy.dialects.postgresql import insert
+else:
+    from sqlalchemy.dialects.sqlite import insert
+
+def _check_unique(connection, index):
+    # rows stored before the index existed may collide, report them instead
+    # of failing on the raw CREATE UNIQUE INDEX error
+    columns = list(index.columns)
+    statement = select(*columns).group_by(*columns).having(func.count() > 1).limit(5)
+    duplicates = connection.execute(statement).all()
+    if duplicates:
+        names = ", ".join(column.name for column in columns)
+        examples = "; ".join(", ".join(map(str, row)) for row in duplicates)
+        raise RuntimeError(
+            f"Cannot create unique index {index.name}: {index.table.name} has duplicate "
+            f"({names}) values, e.g. {examples}. Keep one row per value and rerun python db.py."
+        )
+
+def _create_all(connection):
+    SQLModel.metadata.create_all(connection)
+    # create_all skips tables that already exist, add indexes introduced later
+    inspector = inspect(connection)
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.unique:
+                _check_unique(connection, index)
+            index.create(connection)
+
+async def create_db_and_tables():
+    async with engine.begin() as connection:
+        await connection.run_sync(_create_all)
+
+async def get_session():
+    # handlers return ORM objects after commit, keep them loaded
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
 
-SessionDep = Annotated[Session, Depends(get_session)]
\ No newline at end of file
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
+
+if __name__ == "__main__":
+    # run once per deploy before starting the workers: python db.py
+    from blog import schemas  # noqa: F401, registers the tables on the metadata
+    try:
+        asyncio.run(create_db_and_tables())
+    except RuntimeError as error:
+        sys.exit(str(error))
\ No newline at end of file
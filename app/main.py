@@ -1,20 +1,60 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
 from typing import Annotated, Any
-from datetime import datetime, timedelta
+from threading import RLock
 
-from fastapi import FastAPI, Query, Response, status, Depends, HTTPException
+from fastapi import Body, FastAPI, Query, Request, Response, status, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
+import anyio.to_thread
+from cachetools import TTLCache
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.hmac import HMAC
 import jwt
-from jwt.exceptions import InvalidTokenError
+from jwt.exceptions import ExpiredSignatureError, ImmatureSignatureError, InvalidTokenError
+import orjson
+from sqlalchemy import literal
+from sqlmodel import select
 
 from blog import schemas
 from blog.hash import Hash
-from db import create_db_and_tables, SessionDep
+from db import insert, SessionDep
+
+# upper bound on users per bulk import request, each one costs a bcrypt run
+BULK_USERS_MAX = 100
+
+def get_hash_pool(app) -> ProcessPoolExecutor:
+    # bulk imports hash on every core. Built on first use so workers that never
+    # see a bulk import do not hold a pool, and with forkserver (spawn where it
+    # is unavailable) so it is never forked from a process running threads.
+    if app.state.hash_pool is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        app.state.hash_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context(method),
+        )
+    return app.state.hash_pool
 
 @asynccontextmanager
-async def lifespan(_):
-    create_db_and_tables()
+async def lifespan(app):
+    # bcrypt calls run on the anyio threadpool, size it to the machine
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = (os.cpu_count() or 1) * 2
+    app.state.hash_pool = None
     yield
+    if app.state.hash_pool is not None:
+        app.state.hash_pool.shutdown()
+        app.state.hash_pool = None
 app = FastAPI(
     lifespan=lifespan,
     swagger_ui_init_oauth={
@@ -29,15 +69,69 @@ oauth2_scheme = OAuth2PasswordBearer(
     description="JWT token from login"
 )
 
-def create_access_token(data: dict, expires_delta: timedelta | None = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, schemas.SECRET_KEY, algorithm=schemas.ALGORITHM)
-    return encoded_jwt
+# resolved users keyed by sha256(token), per process. Entries live for at most
+# 5s (or until the token expires) so a deleted user is not served for long.
+# Failed validations are never cached.
+_jwt_cache = TTLCache(maxsize=10_000, ttl=5)
+_jwt_cache_lock = RLock()
+
+# recent failed password checks keyed by hmac(password + stored hash), so a
+# client retrying the same wrong password does not cost a bcrypt run each
+# time. Only failures are cached, a correct password always goes to bcrypt.
+_failed_login_cache = TTLCache(maxsize=5000, ttl=60)
+_failed_login_key = secrets.token_bytes(32)
+_failed_login_lock = RLock()
+
+async def verify_login_password(plain_password: str, hashed_password: str) -> bool:
+    key = hmac.new(
+        _failed_login_key, plain_password.encode() + hashed_password.encode(), "sha256"
+    ).digest()
+    with _failed_login_lock:
+        if key in _failed_login_cache:
+            return False
+    verified = await run_in_threadpool(Hash.verify_password, plain_password, hashed_password)
+    if not verified:
+        with _failed_login_lock:
+            _failed_login_cache[key] = True
+    return verified
+
+def create_access_token(sub: str, ttl: int = 900) -> str:
+    payload = {"sub": sub, "exp": int(time.time()) + ttl}
+    return jwt.encode(payload, schemas.SECRET_KEY, algorithm=schemas.ALGORITHM)
+
+# keyed HMAC contexts by JWT "kid", built once and copied per token so the
+# key setup is not redone on every request. HS256 only has the one key.
+_hmac_keys = {None: HMAC(schemas.SECRET_KEY.encode(), hashes.SHA256())}
+
+def _b64url_decode(segment: str) -> bytes:
+    # strict and canonical, so a token has exactly one accepted spelling
+    data = base64.b64decode(segment + "=" * (-len(segment) % 4), altchars=b"-_", validate=True)
+    if base64.urlsafe_b64encode(data).rstrip(b"=").decode() != segment:
+        raise ValueError("Non-canonical base64url segment")
+    return data
+
+def verify_and_load(token: str) -> dict:
+    # HS256 verification straight on OpenSSL's HMAC through cryptography,
+    # raises the same InvalidTokenError family as jwt.decode
+    try:
+        header_segment, payload_segment, signature = token.split(".")
+        header = orjson.loads(_b64url_decode(header_segment))
+        if header["alg"] != schemas.ALGORITHM:
+            raise InvalidTokenError("Unsupported algorithm")
+        h = _hmac_keys[header.get("kid")].copy()
+        h.update(f"{header_segment}.{payload_segment}".encode())
+        h.verify(_b64url_decode(signature))
+        payload = orjson.loads(_b64url_decode(payload_segment))
+        now = time.time()
+        exp = payload.get("exp")
+        if exp is not None and int(exp) <= now:
+            raise ExpiredSignatureError("Signature has expired")
+        nbf = payload.get("nbf")
+        if nbf is not None and int(nbf) > now:
+            raise ImmatureSignatureError("The token is not yet valid (nbf)")
+    except (InvalidSignature, KeyError, ValueError, TypeError, AttributeError):
+        raise InvalidTokenError("Invalid token")
+    return payload
 
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
@@ -48,18 +142,33 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    key = hashlib.sha256(token.encode()).digest()
+    with _jwt_cache_lock:
+        cached = _jwt_cache.get(key)
+    if cached is not None:
+        user, token_exp = cached
+        if token_exp > time.time():
+            return user
+
     try:
-        payload = jwt.decode(token, schemas.SECRET_KEY, algorithms=[schemas.ALGORITHM])
+        payload = verify_and_load(token)
         username: str = payload.get("sub")
-        if username is None:
+        if not isinstance(username, str):
             raise credentials_exception
         token_data = schemas.TokenData(username=username)
     except InvalidTokenError:
         raise credentials_exception
     
-    user = session.query(schemas.User).filter(schemas.User.email == token_data.username).first()
+    # the password hash is never loaded here, the row is cached process-wide
+    statement = (
+        select(schemas.User.id, schemas.User.name, schemas.User.email)
+        .where(schemas.User.email == token_data.username)
+    )
+    user = (await session.exec(statement)).first()
     if user is None:
         raise credentials_exception
+    with _jwt_cache_lock:
+        _jwt_cache[key] = (user, payload.get("exp", 0))
     return user
 
 @app.post("/login", response_model=schemas.Token)
@@ -67,37 +176,50 @@ async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     session: SessionDep
 ):
-    user = session.query(schemas.User).filter(schemas.User.email == form_data.username).first()
-    if not user or not Hash.verify_password(form_data.password, user.password):
+    user = (await session.exec(select(schemas.User).where(schemas.User.email == form_data.username))).first()
+    if not user or not await verify_login_password(form_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=schemas.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    if Hash.needs_rehash(user.password):
+        user.password = await run_in_threadpool(Hash.get_password_hash, form_data.password)
+        session.add(user)
+        await session.commit()
+    access_token = create_access_token(user.email, schemas.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.get("/blogs", status_code=200, response_model=list[schemas.ShowBlg], tags=["blog"])
-def get_blogs_list(
+@app.get("/blogs", status_code=200, response_model=schemas.BlogPage, tags=["blog"])
+async def get_blogs_list(
     session: SessionDep,
-    offset: int = 0,
+    cursor: int | None = None,
     limit: Annotated[int, Query(le=10)] = 10
 ):
-    return session.query(schemas.Blog).limit(limit).offset(offset).all()
+    # keyset pagination, pass next_cursor back as cursor to get the next page
+    statement = (
+        select(schemas.Blog.id, schemas.Blog.title, schemas.Blog.body)
+        .order_by(schemas.Blog.id)
+        .limit(limit)
+    )
+    if cursor is not None:
+        statement = statement.where(schemas.Blog.id > cursor)
+    rows = (await session.exec(statement)).all()
+    return {
+        "items": [{"title": title, "body": body} for _, title, body in rows],
+        "next_cursor": rows[-1].id if rows else None,
+    }
 
 @app.get("/blog/{id}", status_code=200, tags=["blog"])
-def get_blog_by_id(id: str, response: Response, session: SessionDep) -> dict[str, str] | Any:
-    blog = session.query(schemas.Blog).filter(schemas.Blog.id == id).first()
+async def get_blog_by_id(id: int, response: Response, session: SessionDep) -> dict[str, str] | Any:
+    blog = await session.get(schemas.Blog, id)
     if not blog:
         response.status_code = status.HTTP_404_NOT_FOUND
         return {'detail': f'Blog with id = {id} does not exist'}
     return blog
 
 @app.post("/blog", status_code=200, response_model=schemas.Blog, tags=["blog"])
-def create_blog(
+async def create_blog(
     blog: schemas.BlogBase,
     session: SessionDep,
     current_user: Annotated[schemas.User, Depends(get_current_user)]
@@ -105,37 +227,37 @@ def create_blog(
     db_blog = schemas.Blog.model_validate(blog)
     db_blog.author_id = current_user.id
     session.add(db_blog)
-    session.commit()
-    session.refresh(db_blog)
+    await session.commit()
+    await session.refresh(db_blog)
     return db_blog
 
 @app.delete("/blog/{id}", status_code=200, tags=["blog"])
-def delete_blog(
-    id: str,
+async def delete_blog(
+    id: int,
     response: Response,
     session: SessionDep,
     current_user: Annotated[schemas.User, Depends(get_current_user)]
 ) -> dict[str, str] | Any:
-    blog = session.get(schemas.Blog, id)
+    blog = await session.get(schemas.Blog, id)
     if not blog:
         response.status_code = status.HTTP_404_NOT_FOUND
         return {'detail': f'Blog with id = {id} does not exist'}
     if blog.author_id != current_user.id:
         response.status_code = status.HTTP_403_FORBIDDEN
         return {'detail': 'Not authorized to delete this blog'}
-    session.delete(blog)
-    session.commit()
+    await session.delete(blog)
+    await session.commit()
     return {"ok": True}
 
 @app.patch("/blog/{id}", status_code=200, tags=["blog"])
-def update_blog(
-    id: str,
+async def update_blog(
+    id: int,
     blog_param: schemas.BlogBase,
     response: Response,
     session: SessionDep,
     current_user: Annotated[schemas.User, Depends(get_current_user)]
 ) -> dict[str, str] | Any:
-    blog = session.get(schemas.Blog, id)
+    blog = await session.get(schemas.Blog, id)
     if not blog:
         response.status_code = status.HTTP_404_NOT_FOUND
         return {'detail': f'Blog with id = {id} does not exist'}
@@ -146,32 +268,75 @@ def update_blog(
     for key, value in blog_data.items():
         setattr(blog, key, value)
     session.add(blog)
-    session.commit()
-    session.refresh(blog)
+    await session.commit()
+    await session.refresh(blog)
     return blog
 
-@app.post('/user', status_code=200, tags=["user"])
-def create_user(
+@app.post('/user', status_code=200, response_model=schemas.ShowUser, tags=["user"])
+async def create_user(
     user: schemas.UserBase,
+    session: SessionDep
+) -> Any:
+    conflict = JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={'detail': f"Email {user.email} is already existed"},
+    )
+    # cheap existence check so known emails skip bcrypt, the insert below
+    # still guards against concurrent signups
+    exists_statement = select(literal(True)).where(schemas.User.email == user.email).limit(1)
+    if (await session.exec(exists_statement)).first() is not None:
+        return conflict
+
+    hashed_password = await run_in_threadpool(Hash.get_password_hash, user.password)
+    # the unique email index decides, no separate lookup and no race with it
+    statement = (
+        insert(schemas.User)
+        .values(name=user.name, email=user.email, password=hashed_password)
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(schemas.User.id, schemas.User.name, schemas.User.email)
+    )
+    db_user = (await session.exec(statement)).first()
+    if db_user is None:
+        return conflict
+    await session.commit()
+    return {"name": db_user.name, "email": db_user.email}
+
+@app.post('/users/bulk', status_code=200, response_model=list[schemas.ShowUser], tags=["user"])
+async def create_users_bulk(
+    users: Annotated[list[schemas.UserBase], Body(max_length=BULK_USERS_MAX)],
+    request: Request,
     session: SessionDep,
-    response: Response
-) -> schemas.User | dict[str, str]:
-    existing_user = session.query(schemas.User).filter(schemas.User.email == user.email).first()
-    if existing_user:
-        response.status_code = status.HTTP_409_CONFLICT
-        return {'detail': f"Email {user.email} is already existed"}
-
-    user.password = Hash.get_password_hash(user.password)
-    db_user = schemas.User.model_validate(user)
-    session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
-    return db_user
+    current_user: Annotated[schemas.User, Depends(get_current_user)]
+) -> Any:
+    if not users:
+        return []
+    loop = asyncio.get_running_loop()
+    hash_pool = get_hash_pool(request.app)
+    hashed_passwords = await asyncio.gather(*(
+        loop.run_in_executor(hash_pool, Hash.get_password_hash, user.password) for user in users
+    ))
+    # one multi-row insert, emails that already exist are skipped
+    statement = (
+        insert(schemas.User)
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(schemas.User)
+    )
+    params = [
+        {"name": user.name, "email": user.email, "password": hashed_password}
+        for user, hashed_password in zip(users, hashed_passwords)
+    ]
+    db_users = (await session.exec(statement, params=params)).scalars().all()
+    await session.commit()
+    return db_users
 
 @app.get('/user/{id}', status_code=200, response_model=schemas.ShowUser, tags=["user"])
-def get_user_by_id(id: str, response: Response, session: SessionDep) -> dict[str, str] | Any:
-    user = session.query(schemas.User).filter(schemas.User.id == id).first()
+async def get_user_by_id(id: int, session: SessionDep) -> Any:
+    # never load the password hash for a public lookup
+    statement = select(schemas.User.name, schemas.User.email).where(schemas.User.id == id)
+    user = (await session.exec(statement)).first()
     if not user:
-        response.status_code = status.HTTP_404_NOT_FOUND
-        return {'detail': f'User with id = {id} does not exist'}
-    return user
\ No newline at end of file
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={'detail': f'User with id = {id} does not exist'},
+        )
+    return {"name": user.name, "email": user.email}
\ No newline at end of file
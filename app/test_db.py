@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from db import _create_all
+
+
+def legacy_user_table(*emails):
+    # user table as created before the unique email index was added
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE user (name VARCHAR NOT NULL, email VARCHAR NOT NULL, "
+            "password VARCHAR NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (id))"
+        ))
+        for email in emails:
+            connection.execute(
+                text("INSERT INTO user (name, email, password) VALUES ('n', :email, 'x')"),
+                {"email": email},
+            )
+    return engine
+
+
+def test_create_all_adds_missing_unique_index():
+    engine = legacy_user_table("a@example.com", "b@example.com")
+    with engine.begin() as connection:
+        _create_all(connection)
+        indexes = {index["name"]: index for index in inspect(connection).get_indexes("user")}
+    assert indexes["ix_user_email"]["unique"]
+    with engine.begin() as connection:
+        _create_all(connection)
+
+
+def test_create_all_reports_duplicates_before_unique_index():
+    engine = legacy_user_table("a@example.com", "a@example.com", "b@example.com")
+    with pytest.raises(RuntimeError, match=r"ix_user_email.*a@example\.com"):
+        with engine.begin() as connection:
+            _create_all(connection)
@@ -0,0 +1,261 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import time
+
+import jwt
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from blog import schemas
+import main
+from main import app, verify_and_load
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def clear_auth_caches():
+    main._jwt_cache.clear()
+    main._failed_login_cache.clear()
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def make_token(payload, header=None, key=schemas.SECRET_KEY.encode()) -> str:
+    if header is None:
+        header = {"alg": "HS256", "typ": "JWT"}
+    signing_input = f"{b64url(orjson.dumps(header))}.{b64url(orjson.dumps(payload))}"
+    signature = hmac.new(key, signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{b64url(signature)}"
+
+
+def test_verify_and_load_accepts_pyjwt_token():
+    payload = {"sub": "a@example.com", "exp": int(time.time()) + 60}
+    token = jwt.encode(payload, schemas.SECRET_KEY, algorithm=schemas.ALGORITHM)
+    assert verify_and_load(token) == payload
+
+
+def test_verify_and_load_rejects_forged_signature():
+    token = make_token({"sub": "a@example.com"}, key=b"not-the-secret")
+    with pytest.raises(jwt.InvalidTokenError):
+        verify_and_load(token)
+
+
+def test_verify_and_load_rejects_tampered_payload():
+    header, _, signature = make_token({"sub": "a@example.com"}).split(".")
+    payload = b64url(orjson.dumps({"sub": "admin@example.com"}))
+    with pytest.raises(jwt.InvalidTokenError):
+        verify_and_load(f"{header}.{payload}.{signature}")
+
+
+@pytest.mark.parametrize("header", [
+    {"alg": "none", "typ": "JWT"},
+    {"alg": "HS512", "typ": "JWT"},
+    {"typ": "JWT"},
+])
+def test_verify_and_load_rejects_wrong_alg(header):
+    with pytest.raises(jwt.InvalidTokenError):
+        verify_and_load(make_token({"sub": "a@example.com"}, header=header))
+
+
+def test_verify_and_load_rejects_unknown_kid():
+    token = make_token({"sub": "a@example.com"}, header={"alg": "HS256", "kid": "other"})
+    with pytest.raises(jwt.InvalidTokenError):
+        verify_and_load(token)
+
+
+def test_verify_and_load_rejects_expired_token():
+    token = make_token({"sub": "a@example.com", "exp": int(time.time()) - 1})
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verify_and_load(token)
+
+
+def test_verify_and_load_rejects_token_before_nbf():
+    token = make_token({"sub": "a@example.com", "nbf": int(time.time()) + 60})
+    with pytest.raises(jwt.ImmatureSignatureError):
+        verify_and_load(token)
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "abc",
+    "a.b",
+    "a.b.c.d",
+    "!!!.@@@.###",
+    "e30.e30.",
+])
+def test_verify_and_load_rejects_malformed_segments(token):
+    with pytest.raises(jwt.InvalidTokenError):
+        verify_and_load(token)
+
+
+def flip_last_unused_bit(segment: str) -> str:
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    return segment[:-1] + alphabet[alphabet.index(segment[-1]) ^ 1]
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda s: s + "!",
+    lambda s: s[:4] + "*" + s[4:],
+    lambda s: s + "=",
+    lambda s: s.replace("-", "+").replace("_", "/") if "-" in s or "_" in s else s + "+",
+    flip_last_unused_bit,
+])
+def test_verify_and_load_rejects_non_canonical_signature(mangle):
+    token = make_token({"sub": "a@example.com"})
+    header, payload, signature = token.split(".")
+    assert verify_and_load(token) == {"sub": "a@example.com"}
+    with pytest.raises(jwt.InvalidTokenError):
+        verify_and_load(f"{header}.{payload}.{mangle(signature)}")
+
+
+def test_verify_and_load_rejects_non_dict_header():
+    with pytest.raises(jwt.InvalidTokenError):
+        verify_and_load(make_token({"sub": "a@example.com"}, header=["HS256"]))
+
+
+@pytest.mark.parametrize("payload", [["a@example.com"], "a@example.com", 1])
+def test_verify_and_load_rejects_non_dict_payload(payload):
+    with pytest.raises(jwt.InvalidTokenError):
+        verify_and_load(make_token(payload))
+
+
+def test_non_string_sub_is_unauthorized():
+    token = make_token({"sub": 123, "exp": int(time.time()) + 60})
+    response = client.post(
+        "/blog",
+        json={"title": "t", "body": "b"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 401
+
+
+def test_bulk_users_requires_login():
+    response = client.post(
+        "/users/bulk",
+        json=[{"name": "a", "email": "a@example.com", "password": "pw"}],
+    )
+    assert response.status_code == 401
+
+
+def auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def signup(email: str, password: str = "pw"):
+    response = client.post("/user", json={"name": "n", "email": email, "password": password})
+    assert response.status_code == 200
+
+
+# DELETE /blog/{id} on a missing blog answers 404 once the user is resolved
+# and 401 when authentication fails, without touching any other data
+def test_cached_user_is_not_served_after_token_expiry(monkeypatch):
+    signup("cache-exp@example.com")
+    now = time.time()
+    token = make_token({"sub": "cache-exp@example.com", "exp": int(now) + 60})
+    assert client.delete("/blog/999999", headers=auth_headers(token)).status_code == 404
+    assert len(main._jwt_cache) == 1
+
+    monkeypatch.setattr(main.time, "time", lambda: now + 120)
+    assert client.delete("/blog/999999", headers=auth_headers(token)).status_code == 401
+
+
+def test_failed_token_validation_is_not_cached():
+    token = make_token({"sub": "cache-late@example.com", "exp": int(time.time()) + 60})
+    assert client.delete("/blog/999999", headers=auth_headers(token)).status_code == 401
+    forged = make_token({"sub": "cache-late@example.com"}, key=b"not-the-secret")
+    assert client.delete("/blog/999999", headers=auth_headers(forged)).status_code == 401
+    assert len(main._jwt_cache) == 0
+
+    # once the user exists the very same token is accepted
+    signup("cache-late@example.com")
+    assert client.delete("/blog/999999", headers=auth_headers(token)).status_code == 404
+
+
+def test_repeated_wrong_password_skips_bcrypt(monkeypatch):
+    hashed_password = main.Hash.get_password_hash("right")
+    calls = []
+    verify_password = main.Hash.verify_password
+
+    def counting_verify(plain_password, hashed):
+        calls.append(plain_password)
+        return verify_password(plain_password, hashed)
+
+    monkeypatch.setattr(main.Hash, "verify_password", staticmethod(counting_verify))
+
+    async def attempts():
+        assert not await main.verify_login_password("wrong", hashed_password)
+        assert not await main.verify_login_password("wrong", hashed_password)
+        assert calls == ["wrong"]
+        # a cached failure never blocks the right password, nor is success cached
+        assert await main.verify_login_password("right", hashed_password)
+        assert await main.verify_login_password("right", hashed_password)
+        assert calls == ["wrong", "right", "right"]
+
+    asyncio.run(attempts())
+
+
+def test_signup_never_returns_the_password_hash():
+    response = client.post("/user", json={"name": "n", "email": "hash@example.com", "password": "pw"})
+    assert response.status_code == 200
+    assert response.json() == {"name": "n", "email": "hash@example.com"}
+
+    response = client.post("/user", json={"name": "n", "email": "hash@example.com", "password": "pw"})
+    assert response.status_code == 409
+    assert response.json() == {"detail": "Email hash@example.com is already existed"}
+
+
+def test_missing_user_is_not_found():
+    response = client.get("/user/999999")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "User with id = 999999 does not exist"}
+
+
+def test_cached_user_has_no_password_hash():
+    signup("projection@example.com")
+    token = make_token({"sub": "projection@example.com", "exp": int(time.time()) + 60})
+    assert client.delete("/blog/999999", headers=auth_headers(token)).status_code == 404
+    (user, _), = main._jwt_cache.values()
+    assert user.email == "projection@example.com"
+    assert "password" not in user._fields
+
+
+def test_bulk_users_import():
+    with TestClient(app) as bulk_client:
+        assert bulk_client.app.state.hash_pool is None
+        bulk_client.post("/user", json={"name": "n", "email": "bulk-admin@example.com", "password": "pw"})
+        response = bulk_client.post("/login", data={"username": "bulk-admin@example.com", "password": "pw"})
+        headers = auth_headers(response.json()["access_token"])
+
+        users = [
+            {"name": "b1", "email": "bulk1@example.com", "password": "pw1"},
+            {"name": "b2", "email": "bulk2@example.com", "password": "pw2"},
+            {"name": "admin", "email": "bulk-admin@example.com", "password": "other"},
+        ]
+        response = bulk_client.post("/users/bulk", json=users, headers=headers)
+        assert response.status_code == 200
+        # the existing email is skipped and no hash is returned
+        assert response.json() == [
+            {"name": "b1", "email": "bulk1@example.com"},
+            {"name": "b2", "email": "bulk2@example.com"},
+        ]
+        assert bulk_client.app.state.hash_pool is not None
+
+        # hashes computed in the pool verify, the skipped user keeps their password
+        login = {"username": "bulk2@example.com", "password": "pw2"}
+        assert bulk_client.post("/login", data=login).status_code == 200
+        login = {"username": "bulk-admin@example.com", "password": "other"}
+        assert bulk_client.post("/login", data=login).status_code == 401
+
+        too_many = [
+            {"name": "x", "email": f"bulk-x{i}@example.com", "password": "pw"}
+            for i in range(main.BULK_USERS_MAX + 1)
+        ]
+        response = bulk_client.post("/users/bulk", json=too_many, headers=headers)
+        assert response.status_code == 422
+    assert app.state.hash_pool is None
@@ -1,16 +0,0 @@
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
-class Hash:
-    @staticmethod
-    def verify_password(plain_password: str, hashed_password: str):
-        return pwd_context.verify(plain_password, hashed_password)
-
-    @staticmethod
-    def get_password_hash(password: str):
-        return pwd_context.hash(password)
\ No newline at end of file